@@ -1,6 +1,7 @@
 import sys
 from pathlib import Path
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
 import json
 import os
 
@@ -10,15 +11,53 @@ sys.path.insert(0, str(project_root))
 sys.path.insert(0, str(project_root / "core"))
 
 # Import your existing modules
-from core.resume_parser import extract_text_from_pdf, parse_resume
+from core.resume_parser import extract_text_from_pdf, parse_resume, ResumeTooLargeError
 from core.career_qa import collect_answers, load_answers_from_file
 from core.profile_analyzer import merge_profile, analyze_profile, print_human_summary, save_coaching_report
 from core.job_matcher import find_matching_jobs
+from core.model_router import get_route_stats
+from core.batch_analyzer import analyze_batch, assign_candidate_ids, MAX_BATCH_CANDIDATES, MAX_TARGET_ROLES
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from tempfile import NamedTemporaryFile
-import shutil
+from multipart.multipart import MultipartParser, parse_options_header
+import asyncio
+import resource
+import threading
+import time
+import tracemalloc
+
+# Upload admission control. Limits can be tuned per deployment via env vars.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 5 * 1024 * 1024))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", 20))
+MAX_CONCURRENT_EXTRACTIONS = int(os.getenv("MAX_CONCURRENT_EXTRACTIONS", 2))
+MAX_QUEUED_UPLOADS = int(os.getenv("MAX_QUEUED_UPLOADS", 8))
+EXTRACTION_QUEUE_TIMEOUT = float(os.getenv("EXTRACTION_QUEUE_TIMEOUT", 10))
+UPLOAD_RETRY_AFTER = int(os.getenv("UPLOAD_RETRY_AFTER", 5))
+# tracemalloc slows pdfminer down several times over, so it is off by default;
+# set to N to trace every Nth extraction
+TRACE_UPLOAD_MEMORY_EVERY = int(os.getenv("TRACE_UPLOAD_MEMORY_EVERY", 0))
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+extraction_slots = asyncio.Semaphore(MAX_CONCURRENT_EXTRACTIONS)
+upload_stats = {
+    "active": 0,
+    "queued": 0,
+    "completed": 0,
+    "rejected_busy": 0,
+    "rejected_too_large": 0,
+    "last_extraction_peak_mb": 0.0,
+    "max_extraction_peak_mb": 0.0,
+    "overlapping_measurements": 0,
+}
+# Counters are updated from both the event loop and extraction threads
+upload_stats_lock = threading.Lock()
+active_memory_traces = []
+memory_trace_state = {"started_tracemalloc": False, "extractions": 0}
 
 class AnalyzeRequest(BaseModel):
     resume: dict
@@ -29,8 +68,226 @@ class JobMatchRequest(BaseModel):
     coaching_summary: dict
     num_jobs: int = 5
 
+class BatchCandidate(BaseModel):
+    resume: dict
+    qa: dict
+    candidate_id: Optional[str] = None
+
+class BatchAnalyzeRequest(BaseModel):
+    candidates: List[BatchCandidate] = Field(..., min_length=1, max_length=MAX_BATCH_CANDIDATES)
+    target_roles: List[str] = Field([], max_length=MAX_TARGET_ROLES)
+    num_jobs: int = Field(5, ge=1, le=10)
+
+    @field_validator("candidates")
+    @classmethod
+    def unique_candidate_ids(cls, candidates):
+        assign_candidate_ids([c.model_dump() for c in candidates])
+        return candidates
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def bump_upload_stat(key, delta=1):
+    with upload_stats_lock:
+        upload_stats[key] += delta
+
+def start_memory_trace():
+    """
+    Start measuring Python allocations for one extraction. pdfminer builds its
+    object graph in Python, so the tracemalloc peak tracks its memory use.
+    tracemalloc is process-wide, so the figure is an upper bound: it also counts
+    allocations from other threads (e.g. concurrent /analyze calls). Overlapping
+    extractions are flagged; other work in the process cannot be told apart.
+    """
+    trace = {"overlapped": False}
+    with upload_stats_lock:
+        if active_memory_traces:
+            trace["overlapped"] = True
+            for other in active_memory_traces:
+                other["overlapped"] = True
+        elif not tracemalloc.is_tracing():
+            tracemalloc.start()
+            memory_trace_state["started_tracemalloc"] = True
+        else:
+            tracemalloc.reset_peak()
+        active_memory_traces.append(trace)
+        trace["baseline"] = tracemalloc.get_traced_memory()[0]
+    return trace
+
+def stop_memory_trace(trace):
+    """Stop a trace and return (peak MB above its baseline, whether it overlapped another)."""
+    with upload_stats_lock:
+        peak = tracemalloc.get_traced_memory()[1]
+        active_memory_traces.remove(trace)
+        if not active_memory_traces and memory_trace_state["started_tracemalloc"]:
+            tracemalloc.stop()
+            memory_trace_state["started_tracemalloc"] = False
+    return max(peak - trace["baseline"], 0) / (1024 * 1024), trace["overlapped"]
+
+def should_trace_memory():
+    if TRACE_UPLOAD_MEMORY_EVERY <= 0:
+        return False
+    with upload_stats_lock:
+        memory_trace_state["extractions"] += 1
+        return memory_trace_state["extractions"] % TRACE_UPLOAD_MEMORY_EVERY == 0
+
+def record_extraction_memory(peak_mb, overlapped):
+    with upload_stats_lock:
+        if overlapped:
+            upload_stats["overlapping_measurements"] += 1
+        upload_stats["last_extraction_peak_mb"] = round(peak_mb, 2)
+        upload_stats["max_extraction_peak_mb"] = max(upload_stats["max_extraction_peak_mb"], round(peak_mb, 2))
+
+def reject_busy(status_code, detail):
+    bump_upload_stat("rejected_busy")
+    raise HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(UPLOAD_RETRY_AFTER)}
+    )
+
+def reject_too_large(detail=None):
+    bump_upload_stat("rejected_too_large")
+    raise HTTPException(status_code=413, detail=detail or f"File too large (limit is {MAX_UPLOAD_BYTES} bytes).")
+
+def pdf_part_callbacks(out, state):
+    """python-multipart callbacks that write the "file" part straight to out, counting its bytes."""
+    def on_part_begin():
+        state["header_field"] = b""
+        state["header_value"] = b""
+        state["disposition"] = b""
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_field"].lower() == b"content-disposition":
+            state["disposition"] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["disposition"])
+        if options.get(b"name") != b"file" or b"filename" not in options:
+            return
+        if state["found"]:
+            raise HTTPException(status_code=400, detail="Only one file can be uploaded.")
+        if not options[b"filename"].decode("utf-8", "replace").lower().endswith(".pdf"):
+            raise HTTPException(status_code=400, detail="Only PDF files are supported.")
+        state["found"] = True
+        state["in_file"] = True
+
+    def on_part_data(data, start, end):
+        if not state["in_file"]:
+            return
+        state["file_bytes"] += end - start
+        if state["file_bytes"] > MAX_UPLOAD_BYTES:
+            reject_too_large()
+        out.write(data[start:end])
+
+    def on_part_end():
+        state["in_file"] = False
+
+    return {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    }
+
+async def receive_pdf(request, out):
+    """
+    Stream the request body into out, enforcing MAX_UPLOAD_BYTES as the bytes arrive.
+    Accepts a multipart form with a "file" field or a raw application/pdf body.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type == b"application/pdf":
+        parser = None
+        limit = MAX_UPLOAD_BYTES
+    elif content_type == b"multipart/form-data" and b"boundary" in params:
+        state = {"found": False, "in_file": False, "file_bytes": 0}
+        parser = MultipartParser(params[b"boundary"], pdf_part_callbacks(out, state))
+        limit = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    else:
+        raise HTTPException(status_code=415, detail="Upload a PDF as multipart/form-data or application/pdf.")
+
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            reject_too_large()
+        if parser:
+            parser.write(chunk)
+        else:
+            out.write(chunk)
+
+    if parser:
+        parser.finalize()
+        if not state["found"]:
+            raise HTTPException(status_code=400, detail="No PDF file found in the upload.")
+
+def extract_resume(tmp_path, release_slot, ownership):
+    """
+    Extract and parse a saved PDF, sampling its peak Python memory use if enabled.
+    Runs in a worker thread. Taking the ownership lock hands the temp file and
+    extraction slot to this thread, so both are only released once parsing has
+    actually finished. If the request already gave up, it has cleaned up itself.
+    """
+    if not ownership.acquire(blocking=False):
+        return None
+
+    trace = start_memory_trace() if should_trace_memory() else None
+    try:
+        start = time.perf_counter()
+        text = extract_text_from_pdf(tmp_path, max_pages=MAX_PDF_PAGES)
+        parsed = parse_resume(text, include_preview=False)
+        elapsed = time.perf_counter() - start
+    finally:
+        peak_mb, overlapped = stop_memory_trace(trace) if trace else (0.0, False)
+        remove_temp_file(tmp_path)
+        release_slot()
+
+    if trace:
+        record_extraction_memory(peak_mb, overlapped)
+        note = " (overlapped another extraction)" if overlapped else ""
+        print(f"📄 Extracted resume in {elapsed:.2f}s, peak memory {peak_mb:.1f} MB{note}")
+    else:
+        print(f"📄 Extracted resume in {elapsed:.2f}s, process peak RSS {peak_rss_mb():.1f} MB")
+    return parsed
+
+def remove_temp_file(tmp_path):
+    if tmp_path and os.path.exists(tmp_path):
+        try:
+            os.unlink(tmp_path)
+        except Exception as e:
+            print(f"Warning: Failed to delete temp file {tmp_path}: {e}")
+
 app = FastAPI()
-# Add CORS middleware immediately after app creation
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Check the declared length before the body is read; uploads must declare one
+    if request.method == "POST" and request.url.path == "/upload_resume":
+        content_length = request.headers.get("content-length")
+        if "chunked" in request.headers.get("transfer-encoding", "").lower() or not (content_length and content_length.isdigit()):
+            return JSONResponse(status_code=411, content={"detail": "Content-Length is required for uploads."})
+        if int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            bump_upload_stat("rejected_too_large")
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File too large (limit is {MAX_UPLOAD_BYTES} bytes)."}
+            )
+    return await call_next(request)
+
+# Add CORS middleware last so it also wraps responses from the middleware above
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -44,33 +301,70 @@ app.add_middleware(
 
 
 @app.post("/upload_resume")
-async def upload_resume(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Only PDF files are supported.")
-    
+async def upload_resume(request: Request):
+    # Too many uploads being received or waiting for a slot -> 429 before reading any of the body
+    with upload_stats_lock:
+        queue_full = upload_stats["queued"] >= MAX_QUEUED_UPLOADS
+        if not queue_full:
+            upload_stats["queued"] += 1
+    if queue_full:
+        reject_busy(429, "Too many resume uploads in progress. Please retry shortly.")
+
+    loop = asyncio.get_running_loop()
+
+    def release_slot():
+        # Called from the worker thread once extraction is done
+        loop.call_soon_threadsafe(finish_extraction)
+
+    def finish_extraction():
+        bump_upload_stat("active", -1)
+        extraction_slots.release()
+
+    # Whoever takes this lock first (the worker when it starts, or this handler
+    # when it bails out before that) cleans up the temp file and slot
+    ownership = threading.Lock()
+    slot_held = False
     tmp_path = None
     try:
-        # Save upload to temp file
-        with NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            shutil.copyfileobj(file.file, tmp)
-            tmp_path = tmp.name
+        try:
+            # Stream the body to a temp file, enforcing the byte limit as it arrives.
+            # No extraction slot is held yet, so slow clients can't block parsing.
+            with NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
+                tmp_path = tmp.name
+                await receive_pdf(request, tmp)
 
-        # Ensure file handle is closed
-        await file.close()
+            # Slots only cover PDF parsing: no slot in time -> 503
+            try:
+                await asyncio.wait_for(extraction_slots.acquire(), timeout=EXTRACTION_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                reject_busy(503, "Resume processing is busy. Please retry shortly.")
+            slot_held = True
+            bump_upload_stat("active")
+        finally:
+            bump_upload_stat("queued", -1)
 
-        # Parse resume
-        text = extract_text_from_pdf(tmp_path)
-        parsed = parse_resume(text)
+        # Parse resume off the event loop; the worker claims the slot and temp file when it starts
+        parsed = await run_in_threadpool(extract_resume, tmp_path, release_slot, ownership)
+        bump_upload_stat("completed")
         return parsed
+    except HTTPException:
+        raise
+    except ResumeTooLargeError as e:
+        reject_too_large(str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process resume: {str(e)}")
     finally:
-        # Clean up temp file
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except Exception as e:
-                print(f"Warning: Failed to delete temp file {tmp_path}: {e}")
+        if ownership.acquire(blocking=False):
+            remove_temp_file(tmp_path)
+            if slot_held:
+                finish_extraction()
+
+@app.get("/upload_stats")
+def get_upload_stats():
+    with upload_stats_lock:
+        stats = dict(upload_stats)
+    stats["process_peak_rss_mb"] = round(peak_rss_mb(), 2)
+    return stats
 
 @app.post("/start_qa")
 def start_qa(session_name: str = None):
@@ -95,6 +389,22 @@ def analyze(req: AnalyzeRequest):
     save_coaching_report(report, summary_text=summary)
     return {"report": report, "summary": summary}
 
+@app.post("/analyze_batch")
+def analyze_candidates(req: BatchAnalyzeRequest):
+    try:
+        results = analyze_batch(
+            [c.model_dump() for c in req.candidates],
+            target_roles=req.target_roles,
+            num_jobs=req.num_jobs
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for result in results:
+        if "report" in result:
+            result["summary"] = print_human_summary(result["report"])
+    return {"results": results}
+
 @app.post("/find_jobs")
 def find_jobs(req: JobMatchRequest):
     try:
@@ -103,6 +413,10 @@ def find_jobs(req: JobMatchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/model_stats")
+def model_stats():
+    return get_route_stats()
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
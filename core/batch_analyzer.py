@@ -0,0 +1,244 @@
+import os
+import json
+from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from core.model_router import chat_completion, load_route_config
+from core.profile_analyzer import merge_profile, clean_llm_response
+
+# Rough input budget per request. Output is budgeted separately: each candidate
+# needs a full report plus one entry per job, and the whole reply has to fit in
+# the route's max_tokens or it is cut off mid-JSON.
+DEFAULT_TOKEN_BUDGET = 12000
+DEFAULT_MAX_PER_REQUEST = 3
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+REPORT_OUTPUT_TOKENS = 700
+JOB_OUTPUT_TOKENS = 150
+MAX_CONCURRENT_REQUESTS = 3
+
+MAX_BATCH_CANDIDATES = 20
+MAX_TARGET_ROLES = 10
+
+REPORT_KEYS = ["profile_type", "summary", "strengths", "gaps", "recommendations", "suggested_jobs"]
+
+# Shared by every candidate in a request, so the instructions are sent once
+# per batch instead of once per candidate. The wording follows analyze_profile
+# and find_matching_jobs so a candidate gets the same kind of report either way.
+BATCH_SYSTEM_PROMPT = """You are an expert career coach and job matching expert. You will receive several
+candidate profiles at once. Each profile includes the raw resume text and raw Q&A answers and is
+labelled with a candidate_id. Analyze every candidate independently - never mix details between candidates.
+
+Use the raw resume text and raw Q&A answers to give the most personalized advice.
+
+For each candidate:
+1. Determine if this candidate should pivot, grow in place, or reinvent.
+2. Identify key motivations and strengths.
+3. Highlight skill gaps or areas to improve.
+4. Suggest a list of suitable job titles and industries.
+5. Recommend personalized next steps.
+6. Find matching job opportunities. When target roles are given, assess the candidate against
+   each target role; otherwise suggest realistic roles that fit their career direction.
+   Be specific and realistic in your job suggestions, considering the candidate's current level
+   and potential for growth in their chosen direction.
+
+Each report uses these keys:
+- "profile_type": a category (e.g. "Pivot", "Grow in place", "Reinvent")
+- "summary": a concise paragraph summarizing the candidate
+- "strengths": a list of natural-language strengths
+- "gaps": a list of skill or experience gaps
+- "recommendations": a list of specific, actionable next steps (not categories or labels)
+- "suggested_jobs": a list of actual job titles or roles
+
+Each job match uses these keys:
+- "Job Title": a realistic job title
+- "Job Description": a brief job description
+- "Match Reasons": how this job aligns with their career direction and goals
+- "Matching Skills": a list of skills from their strengths
+- "Skills to Develop": a list of skills based on their gaps and recommendations
+
+IMPORTANT: Your response must be a valid JSON object with a "candidates" array containing exactly one
+entry per candidate, in this format:
+{
+  "candidates": [
+    {
+      "candidate_id": "candidate_1",
+      "report": { "profile_type": "...", "summary": "...", "strengths": [], "gaps": [], "recommendations": [], "suggested_jobs": [] },
+      "jobs": [ { "Job Title": "...", "Job Description": "...", "Match Reasons": "...", "Matching Skills": [], "Skills to Develop": [] } ]
+    }
+  ]
+}"""
+
+def assign_candidate_ids(candidates):
+    """
+    Return the candidate_id for each candidate, defaulting to candidate_<n>.
+    Raises ValueError on duplicates so callers can always match results by ID.
+    """
+    ids = [str(c.get("candidate_id") or f"candidate_{i + 1}") for i, c in enumerate(candidates)]
+    duplicates = sorted({cid for cid in ids if ids.count(cid) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate candidate_id values: {', '.join(duplicates)}")
+    return ids
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English prompts
+    return len(text) // 4 + 1
+
+def format_candidate(candidate_id, profile):
+    return f"""=== Candidate {candidate_id} ===
+Candidate Resume:
+{profile.get('raw_resume_text', '')}
+
+Candidate Q&A:
+{json.dumps(profile.get('raw_qa_responses', {}), indent=2)}
+"""
+
+def estimate_output_tokens(num_jobs):
+    """Estimated reply size for one candidate: the report plus its job entries."""
+    return REPORT_OUTPUT_TOKENS + num_jobs * JOB_OUTPUT_TOKENS
+
+def candidates_per_request(max_output_tokens, jobs_per_candidate, max_per_request=DEFAULT_MAX_PER_REQUEST):
+    # Leave ~10% headroom for the JSON wrapper and estimation error
+    fits = int(max_output_tokens * 0.9) // estimate_output_tokens(jobs_per_candidate)
+    return max(1, min(max_per_request, fits))
+
+def pack_candidates(blocks, token_budget=DEFAULT_TOKEN_BUDGET, max_per_request=DEFAULT_MAX_PER_REQUEST):
+    """
+    Greedily pack (candidate_id, text) blocks into batches that stay under the token budget.
+    A single block larger than the budget still gets a batch of its own.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for candidate_id, text in blocks:
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_per_request):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append((candidate_id, text))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def build_messages(batch, target_roles, num_jobs):
+    if target_roles:
+        roles_text = "Target roles (assess every candidate against each of these):\n" + "\n".join(f"- {role}" for role in target_roles)
+    else:
+        roles_text = f"No target roles given. Suggest {num_jobs} matching jobs per candidate."
+
+    ids = ", ".join(candidate_id for candidate_id, _ in batch)
+    candidates_text = "\n".join(text for _, text in batch)
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT + "\n\n" + roles_text},
+        {"role": "user", "content": f"Analyze these candidates ({ids}):\n\n{candidates_text}"}
+    ]
+
+def split_batch_response(content, candidate_ids):
+    """
+    Split a combined batch response into per-candidate results.
+    Every candidate_id gets an entry; malformed or missing ones get an error instead.
+    """
+    if not content:
+        return {cid: {"error": "Empty response from model"} for cid in candidate_ids}
+
+    try:
+        data = json.loads(clean_llm_response(content))
+    except json.JSONDecodeError as e:
+        return {cid: {"error": "Response was not valid JSON", "exception": str(e)} for cid in candidate_ids}
+
+    entries = data.get("candidates") if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return {cid: {"error": "Invalid response format - missing 'candidates' list"} for cid in candidate_ids}
+
+    by_id = {}
+    for entry in entries:
+        if isinstance(entry, dict) and entry.get("candidate_id") in candidate_ids:
+            by_id.setdefault(entry["candidate_id"], entry)
+
+    results = {}
+    for cid in candidate_ids:
+        entry = by_id.get(cid)
+        if entry is None:
+            results[cid] = {"error": "Candidate missing from response"}
+            continue
+        report = entry.get("report")
+        if not isinstance(report, dict) or not any(key in report for key in REPORT_KEYS):
+            results[cid] = {"error": "Invalid report for candidate", "raw_response": entry}
+            continue
+        jobs = entry.get("jobs")
+        results[cid] = {"report": report, "jobs": jobs if isinstance(jobs, list) else []}
+    return results
+
+def run_batch(client, batch, target_roles, num_jobs, max_output_tokens):
+    candidate_ids = [candidate_id for candidate_id, _ in batch]
+    try:
+        response = chat_completion(
+            client,
+            "batch_analysis",
+            messages=build_messages(batch, target_roles, num_jobs),
+            temperature=0.7,
+            max_tokens=max_output_tokens,
+            response_format={"type": "json_object"}
+        )
+    except Exception as e:
+        print("❌ GPT batch request failed:", e)
+        return {cid: {"error": "OpenAI API request failed", "exception": str(e)} for cid in candidate_ids}
+
+    try:
+        choice = response.choices[0]
+        if choice.finish_reason == "length":
+            return {cid: {"error": "Response was cut off at the output token limit"} for cid in candidate_ids}
+        return split_batch_response(choice.message.content, candidate_ids)
+    except Exception as e:
+        print("❌ Failed to split batch response:", e)
+        return {cid: {"error": "Failed to process batch response", "exception": str(e)} for cid in candidate_ids}
+
+def analyze_batch(candidates, target_roles=None, num_jobs=5, api_key=None,
+                  token_budget=DEFAULT_TOKEN_BUDGET, max_per_request=DEFAULT_MAX_PER_REQUEST):
+    """
+    Analyze several candidates against the same target roles in as few requests as possible.
+
+    candidates is a list of dicts with "resume", "qa" and an optional "candidate_id".
+    Returns one result per candidate, in input order, each with either
+    "report" and "jobs" or an "error". Candidates that fail inside a shared
+    batch are retried once on their own so one bad entry does not sink the rest.
+    """
+    target_roles = target_roles or []
+    if len(candidates) > MAX_BATCH_CANDIDATES:
+        raise ValueError(f"Too many candidates ({len(candidates)}); the limit is {MAX_BATCH_CANDIDATES}.")
+    if len(target_roles) > MAX_TARGET_ROLES:
+        raise ValueError(f"Too many target roles ({len(target_roles)}); the limit is {MAX_TARGET_ROLES}.")
+
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("No OpenAI API key provided or found in environment.")
+
+    client = OpenAI(api_key=api_key)
+    route_config = load_route_config()["routes"].get("batch_analysis", {})
+    max_output_tokens = route_config.get("max_tokens", DEFAULT_MAX_OUTPUT_TOKENS)
+    jobs_per_candidate = len(target_roles) or num_jobs
+    max_per_request = candidates_per_request(max_output_tokens, jobs_per_candidate, max_per_request)
+
+    blocks = []
+    for candidate_id, candidate in zip(assign_candidate_ids(candidates), candidates):
+        profile = merge_profile(candidate.get("resume", {}), candidate.get("qa", {}))
+        blocks.append((candidate_id, format_candidate(candidate_id, profile)))
+
+    batches = pack_candidates(blocks, token_budget, max_per_request)
+    print(f"Analyzing {len(blocks)} candidates in {len(batches)} requests...")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        for batch_results in executor.map(lambda b: run_batch(client, b, target_roles, num_jobs, max_output_tokens), batches):
+            results.update(batch_results)
+
+        retry = [
+            [(cid, text)] for batch in batches if len(batch) > 1
+            for cid, text in batch if "error" in results[cid]
+        ]
+        if retry:
+            print(f"Retrying {len(retry)} failed candidates individually...")
+            for batch_results in executor.map(lambda b: run_batch(client, b, target_roles, num_jobs, max_output_tokens), retry):
+                results.update(batch_results)
+
+    return [dict(candidate_id=cid, **results[cid]) for cid, _ in blocks]
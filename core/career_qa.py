@@ -4,6 +4,7 @@ import os
 from datetime import datetime
 from openai import OpenAI
 from pathlib import Path
+from core.model_router import chat_completion
 
 SYSTEM_PROMPT = """
 You are an AI career coach. Analyze the user's responses about their career preferences, motivations, and skills.
@@ -50,8 +51,9 @@ def analyze_with_llm(responses, api_key):
 
     input_text = "\n".join([f"{k}: {v}" for k, v in responses.items()])
 
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
+    response = chat_completion(
+        client,
+        "qa_classification",
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": input_text}
@@ -2,6 +2,7 @@ import os
 from openai import OpenAI
 from typing import List, Dict
 import json
+from core.model_router import chat_completion
 
 # Initialize OpenAI client only if API key is available
 client = None
@@ -86,8 +87,9 @@ def find_matching_jobs(coaching_summary: Dict, num_jobs: int = 5) -> List[Dict]:
     }}"""
 
     print("Sending request to OpenAI...")
-    response = client.chat.completions.create(
-        model="gpt-4-turbo-preview",
+    response = chat_completion(
+        client,
+        "job_matching",
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
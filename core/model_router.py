@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import openai
+
+# Routes map an endpoint/task to an ordered list of model tiers. The first tier
+# is tried first; on a timeout or transient error the next tier is used.
+# Everything is read from shared/model_routes.json (or MODEL_ROUTES_PATH) so
+# speed/quality trade-offs can be tuned per endpoint without touching code.
+DEFAULT_TIMEOUT = 60
+# Transient errors that move a request on to the next tier. APIConnectionError
+# also covers APITimeoutError.
+FALLBACK_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+_config = None
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def load_route_config():
+    global _config
+    if _config is not None:
+        return _config
+
+    project_root = Path(__file__).parent.parent
+    config_path = Path(os.getenv("MODEL_ROUTES_PATH", project_root / "shared" / "model_routes.json"))
+
+    if not config_path.exists():
+        raise FileNotFoundError(f"model_routes.json not found at {config_path}")
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    # Allow swapping the model behind a tier from the environment, e.g. MODEL_TIER_FAST=gpt-4o-mini
+    for tier in config.get("tiers", {}):
+        override = os.getenv(f"MODEL_TIER_{tier.upper()}")
+        if override:
+            config["tiers"][tier] = override
+
+    _config = config
+    return _config
+
+
+def models_for_route(route):
+    """Return the ordered list of (tier, model) pairs configured for a route."""
+    config = load_route_config()
+    route_config = config.get("routes", {}).get(route)
+    if not route_config:
+        raise KeyError(f"Unknown model route: {route}")
+
+    tiers = config.get("tiers", {})
+    return [(tier, tiers[tier]) for tier in route_config.get("tiers", []) if tier in tiers]
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens=0):
+    pricing = load_route_config().get("pricing", {}).get(model)
+    if not pricing:
+        return 0.0
+    # Cached prompt tokens are part of prompt_tokens but billed at the cached rate
+    input_price = pricing.get("input", 0)
+    cached_price = pricing.get("cached_input", input_price)
+    return (
+        ((prompt_tokens - cached_tokens) / 1000) * input_price
+        + (cached_tokens / 1000) * cached_price
+        + (completion_tokens / 1000) * pricing.get("output", 0)
+    )
+
+
+def _record(route, model, latency, response=None, error=None, fell_back=False):
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+
+    with _stats_lock:
+        route_stats = _stats.setdefault(route, {})
+        entry = route_stats.setdefault(model, {
+            "requests": 0,
+            "errors": 0,
+            "fallbacks": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "cost": 0.0,
+        })
+        entry["requests"] += 1
+        entry["total_latency"] += latency
+        entry["max_latency"] = max(entry["max_latency"], latency)
+        if error is not None:
+            entry["errors"] += 1
+        if fell_back:
+            entry["fallbacks"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+        entry["cached_tokens"] += cached_tokens
+        entry["cost"] += estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens)
+
+
+def get_route_stats():
+    """Return a snapshot of per-route, per-model latency, token and cost statistics."""
+    with _stats_lock:
+        snapshot = {}
+        for route, models in _stats.items():
+            snapshot[route] = {}
+            for model, entry in models.items():
+                stats = dict(entry)
+                stats["avg_latency"] = entry["total_latency"] / entry["requests"] if entry["requests"] else 0.0
+                stats["cost"] = round(entry["cost"], 6)
+                snapshot[route][model] = stats
+        return snapshot
+
+
+def reset_route_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def chat_completion(client, route, messages, **kwargs):
+    """
+    Run a chat completion for the given route, trying each configured tier in order.
+    Falls back to the next tier on timeouts, connection errors, 429s and 5xx errors;
+    any other error is raised to the caller. The route's max_tokens is used when
+    the caller doesn't pass one.
+    """
+    route_config = load_route_config()["routes"].get(route, {})
+    timeout = route_config.get("timeout", DEFAULT_TIMEOUT)
+    # A route-level reply cap applies unless the caller sets its own
+    if "max_tokens" in route_config and kwargs.get("max_tokens") is None:
+        kwargs["max_tokens"] = route_config["max_tokens"]
+    candidates = models_for_route(route)
+    if not candidates:
+        raise ValueError(f"No models configured for route: {route}")
+
+    last_error = None
+    for i, (tier, model) in enumerate(candidates):
+        has_next = i + 1 < len(candidates)
+        # Earlier tiers fail fast and hand over to the next tier; the last
+        # tier keeps the client's default retries
+        options = {"timeout": timeout}
+        if has_next:
+            options["max_retries"] = 0
+
+        start = time.perf_counter()
+        try:
+            response = client.with_options(**options).chat.completions.create(
+                model=model,
+                messages=messages,
+                **kwargs
+            )
+        except FALLBACK_ERRORS as e:
+            _record(route, model, time.perf_counter() - start, error=e, fell_back=has_next)
+            print(f"⏱️ {route}: {model} ({tier}) failed: {type(e).__name__}"
+                  + (", falling back" if has_next else ""))
+            last_error = e
+            continue
+        except Exception as e:
+            _record(route, model, time.perf_counter() - start, error=e)
+            raise
+
+        _record(route, model, time.perf_counter() - start, response=response)
+        return response
+
+    raise last_error
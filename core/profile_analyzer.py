@@ -2,6 +2,7 @@ import os
 import json
 from openai import OpenAI
 from datetime import datetime
+from core.model_router import chat_completion
 
 REPORTS_DIR = "reports"
 os.makedirs(REPORTS_DIR, exist_ok=True)
@@ -40,49 +41,25 @@ def clean_llm_response(content: str) -> str:
         content = content[:-3].strip()
     return content
 
-def analyze_profile(profile, api_key=None):
-    # Prefer explicit API key, fallback to env var
-    api_key = api_key or os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("No OpenAI API key provided or found in environment.")
-
-    client = OpenAI(api_key=api_key)
-
-    prompt = f"""
-You are an expert career coach. Analyze the following candidate profile, which includes a parsed resume and career-related answers.
-
-Use the raw resume text and raw Q&A answers to give the most personalized advice.
-
-Your job is to:
-1. Determine if this candidate should pivot, grow in place, or reinvent.
-2. Identify key motivations and strengths.
-3. Highlight skill gaps or areas to improve.
-4. Suggest a list of suitable job titles and industries.
-5. Recommend personalized next steps.
-
-Return your response as a structured JSON object using these keys:
-- "profile_type": a category (e.g. "Pivot", "Grow in place", "Reinvent")
-- "summary": a concise paragraph summarizing the candidate
-- "strengths": a list of natural-language strengths
-- "gaps": a list of skill or experience gaps
-- "recommendations": a list of specific, actionable next steps (not categories or labels)
-- "suggested_jobs": a list of actual job titles or roles
-
-Candidate Resume:
+def format_candidate_block(profile):
+    return f"""Candidate Resume:
 {profile.get('raw_resume_text', '')}
 
 Candidate Q&A:
 {json.dumps(profile.get('raw_qa_responses', {}), indent=2)}
-    """
+"""
 
+def request_json(client, route, prompt, temperature):
+    """Run a routed chat completion and parse the reply as JSON, returning an error dict on failure."""
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
+        response = chat_completion(
+            client,
+            route,
             messages=[
                 {"role": "system", "content": "You are a career coach assistant."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.7,
+            temperature=temperature,
         )
     except Exception as e:
         print("❌ GPT request failed:", e)
@@ -103,6 +80,82 @@ Candidate Q&A:
             "raw_response": raw
         }
 
+def analyze_profile(profile, api_key=None):
+    # Prefer explicit API key, fallback to env var
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("No OpenAI API key provided or found in environment.")
+
+    client = OpenAI(api_key=api_key)
+    candidate = format_candidate_block(profile)
+
+    # Cheap-first: the "profile_classification" route picks the direction and
+    # short fields, then the "profile_analysis" route writes the long-form
+    # coaching for that direction.
+    classification_prompt = f"""
+You are an expert career coach. Classify the following candidate profile, which includes a parsed resume and career-related answers.
+
+Return your response as a structured JSON object using these keys:
+- "profile_type": one of "Pivot", "Grow in place", "Reinvent"
+- "suggested_jobs": a list of actual job titles or roles
+
+{candidate}
+    """
+
+    classification = request_json(client, "profile_classification", classification_prompt, 0.2)
+    classified = "error" not in classification and classification.get("profile_type")
+
+    if classified:
+        direction = f"""This candidate has been classified as: {classification['profile_type']}
+Suggested roles: {json.dumps(classification.get('suggested_jobs', []))}
+
+Your job is to:
+1. Identify key motivations and strengths for this direction.
+2. Highlight skill gaps or areas to improve for this direction.
+3. Recommend personalized next steps that move them in this direction.
+
+Return your response as a structured JSON object using these keys:"""
+    else:
+        # Classification failed, so the large model picks the direction itself
+        direction = """Your job is to:
+1. Determine if this candidate should pivot, grow in place, or reinvent.
+2. Identify key motivations and strengths.
+3. Highlight skill gaps or areas to improve.
+4. Suggest a list of suitable job titles and industries.
+5. Recommend personalized next steps.
+
+Return your response as a structured JSON object using these keys:
+- "profile_type": a category (e.g. "Pivot", "Grow in place", "Reinvent")
+- "suggested_jobs": a list of actual job titles or roles"""
+
+    analysis_prompt = f"""
+You are an expert career coach. Analyze the following candidate profile, which includes a parsed resume and career-related answers.
+
+Use the raw resume text and raw Q&A answers to give the most personalized advice.
+
+{direction}
+- "summary": a concise paragraph summarizing the candidate
+- "strengths": a list of natural-language strengths
+- "gaps": a list of skill or experience gaps
+- "recommendations": a list of specific, actionable next steps (not categories or labels)
+
+{candidate}
+    """
+
+    analysis = request_json(client, "profile_analysis", analysis_prompt, 0.7)
+    if "error" in analysis:
+        return analysis
+
+    source = classification if classified else analysis
+    return {
+        "profile_type": source.get("profile_type"),
+        "summary": analysis.get("summary"),
+        "strengths": analysis.get("strengths"),
+        "gaps": analysis.get("gaps"),
+        "recommendations": analysis.get("recommendations"),
+        "suggested_jobs": source.get("suggested_jobs"),
+    }
+
 def save_coaching_report(report, summary_text=None):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     json_path = os.path.join(REPORTS_DIR, f"coaching_report_{timestamp}.json")
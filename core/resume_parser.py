@@ -6,28 +6,38 @@ from datetime import datetime
 RESUME_DIR = "resumes"
 os.makedirs(RESUME_DIR, exist_ok=True)
 
-def extract_text_from_pdf(pdf_path):
-    text = ""
+class ResumeTooLargeError(ValueError):
+    """Raised when a PDF exceeds the allowed number of pages."""
+
+def extract_text_from_pdf(pdf_path, max_pages=None):
+    parts = []
     with pdfplumber.open(pdf_path) as pdf:
+        if max_pages is not None and len(pdf.pages) > max_pages:
+            raise ResumeTooLargeError(f"PDF has {len(pdf.pages)} pages (limit is {max_pages}).")
         for page in pdf.pages:
             page_text = page.extract_text()
             if page_text:
-                text += page_text + "\n"
-    return text
+                parts.append(page_text + "\n")
+            # Drop the page's cached chars/objects before moving on so
+            # image-heavy PDFs don't keep every page's object graph alive
+            page.close()
+    return "".join(parts)
 
 def extract_section(text, keywords):
     import re
     pattern = '|'.join(re.escape(kw) for kw in keywords)
     return re.findall(rf'({pattern})(.*?)(?=\n[A-Z\s]{{2,}}|\Z)', text, re.DOTALL | re.IGNORECASE)
 
-def parse_resume(text):
-    return {
+def parse_resume(text, include_preview=True):
+    parsed = {
         "education": extract_section(text, ["Education", "EDUCATION"]),
         "experience": extract_section(text, ["Experience", "EXPERIENCE", "Work History"]),
         "skills": extract_section(text, ["Skills", "SKILLS", "Technologies"]),
         "raw_text": text,
-        "raw_text_preview": text[:1000] + "..."
     }
+    if include_preview:
+        parsed["raw_text_preview"] = text[:1000] + "..."
+    return parsed
 
 def save_parsed_resume(data):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")